@@ -1,12 +1,12 @@
 import os
 import re
-import json
 import logging
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import markdown
+import orjson
 from bs4 import BeautifulSoup
 import github
 from github import Github
@@ -21,6 +21,77 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+REQUIREMENTS_ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert requirements analyst. Extract structured requirements from the provided documents.
+Identify:
+1. Functional requirements
+2. Technical requirements
+3. User interface requirements
+4. Integration requirements
+5. Performance requirements
+Format your response as a JSON object with these categories as keys, and lists of specific requirements as values."""),
+    ("human", "{content}")
+])
+
+IMPLEMENTATION_PLANNING_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert software architect specializing in multi-threaded applications.
+Create a detailed implementation plan for a multi-agent system with an AI User Agent, which analyzes requirements and sends requests, and an Assistant Agent, which processes requests and implements solutions.
+The implementation should support multi-threaded request handling, GitHub branch management for feature isolation, and document processing for requirement analysis.
+Respond with JSON only: {{"phases": [{{"name": str, "description": str, "tasks": [{{"name": str, "description": str, "priority": "high" | "medium" | "low", "dependencies": [task name], "estimated_effort": "hours"}}]}}], "components": [{{"name": str, "description": str, "files": [{{"path": str, "purpose": str}}]}}]}}"""),
+    ("human", "Requirements: {requirements}")
+])
+
+ASSISTANT_REQUEST_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are the AI User Agent formulating a request to the Assistant Agent.
+Create a clear, detailed request that specifies:
+1. The task to be implemented
+2. Technical requirements and constraints
+3. Expected deliverables
+4. Any dependencies or prerequisites
+Format the request in a way that is easy for the Assistant Agent to understand and implement."""),
+    ("human", "Task: {task}")
+])
+
+PROJECT_STATE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert software analyst comparing the current project state with the implementation plan.
+Identify completed tasks, partially implemented features, missing implementations, and deviations from the plan.
+Respond with JSON only: {{"completed": [task name], "partial": [{{"task_id": task name, "progress": 0.0-1.0, "missing": str}}], "missing": [task name], "deviations": [str], "next_steps": [str]}}"""),
+    ("human", "Implementation Plan: {plan}\n\nProject Files: {files}")
+])
+
+FURTHER_REQUESTS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are the AI User Agent formulating further requests to the Assistant Agent based on project state analysis.
+For each missing or partially implemented task, create a clear, detailed request that specifies:
+1. The task to be implemented or completed
+2. Technical requirements and constraints
+3. Expected deliverables
+4. Any dependencies or prerequisites
+Format each request in a way that is easy for the Assistant Agent to understand and implement.
+Separate the requests with a line containing only ---."""),
+    ("human", "Project State Analysis: {analysis}")
+])
+
+# Analysis fields that describe remaining work, the only ones further requests need
+REMAINING_WORK_FIELDS = ("partial", "missing", "deviations", "next_steps")
+
+# Files the agents generate themselves; the plan is passed to the prompt separately
+GENERATED_PROJECT_FILES = {
+    "implementation_plan.json",
+    "implementation_phases_results.json",
+    "project_management_report.json",
+    "post_merge_analysis.json",
+}
+
+# Directories that never contain project sources worth comparing
+EXCLUDED_PROJECT_DIRS = {"__pycache__", "node_modules", "venv", "env"}
+
+# Maximum characters of each project file included in the project state prompt
+MAX_PROJECT_FILE_CHARS = 4000
+
+def _to_prompt_json(data: Any) -> str:
+    """Serialize data as compact JSON for interpolation into a prompt."""
+    return orjson.dumps(data).decode("utf-8")
+
 class AIUserAgent:
     """
     AI User Agent that analyzes project requirements, creates implementation plans,
@@ -31,7 +102,8 @@ class AIUserAgent:
                  project_dir: str = ".",
                  github_token: Optional[str] = None,
                  repo_name: Optional[str] = None,
-                 model_name: str = "gpt-4o-mini"):
+                 model_name: str = "gpt-4o-mini",
+                 llm: Optional[ChatOpenAI] = None):
         """
         Initialize the AI User Agent.
         
@@ -40,10 +112,19 @@ class AIUserAgent:
             github_token: GitHub API token for repository access
             repo_name: GitHub repository name (format: "owner/repo")
             model_name: LLM model to use for analysis and planning
+            llm: Chat model to use instead of creating one (lets agents share a connection pool)
         """
         self.project_dir = Path(project_dir)
         self.model_name = model_name
-        self.llm = ChatOpenAI(model=model_name, temperature=0)
+        self.llm = llm or ChatOpenAI(model=model_name, temperature=0)
+        
+        # Chains reused across calls
+        self.requirements_chain = REQUIREMENTS_ANALYSIS_PROMPT | self.llm | JsonOutputParser()
+        self.planning_chain = IMPLEMENTATION_PLANNING_PROMPT | self.llm | JsonOutputParser()
+        self.request_chain = ASSISTANT_REQUEST_PROMPT | self.llm | StrOutputParser()
+        self.project_state_chain = PROJECT_STATE_PROMPT | self.llm | JsonOutputParser()
+        self.further_requests_chain = FURTHER_REQUESTS_PROMPT | self.llm | StrOutputParser()
+        
         self.executor = ThreadPoolExecutor(max_workers=5)
         
         # GitHub integration
@@ -98,7 +179,8 @@ class AIUserAgent:
     
     async def _find_requirement_documents(self) -> List[Path]:
         """Find all markdown requirement documents in the project directory."""
-        md_files = list(self.project_dir.glob("**/*.md"))
+        # Sorted so the documents appear in the same order in every prompt
+        md_files = sorted(self.project_dir.glob("**/*.md"))
         # Filter out non-requirement documents (implementation details, etc.)
         requirement_docs = []
         
@@ -140,26 +222,8 @@ class AIUserAgent:
             
             combined_content += f"\n\n--- Document: {doc_path.name} ---\n\n{text}"
         
-        # Create a prompt for requirement analysis
-        analysis_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert requirements analyst. Extract structured requirements from the provided documents.
-            Identify:
-            1. Functional requirements
-            2. Technical requirements
-            3. User interface requirements
-            4. Integration requirements
-            5. Performance requirements
-            
-            Format your response as a JSON object with these categories as keys, and lists of specific requirements as values.
-            """),
-            ("human", "{content}")
-        ])
-        
-        # Create a chain for requirement analysis
-        analysis_chain = analysis_prompt | self.llm | JsonOutputParser()
-        
         # Extract requirements
-        requirements = await analysis_chain.ainvoke({"content": combined_content})
+        requirements = await self.requirements_chain.ainvoke({"content": combined_content})
         
         logger.info("Requirements analysis complete.")
         return requirements
@@ -174,58 +238,8 @@ class AIUserAgent:
         Returns:
             Implementation plan as a dictionary
         """
-        # Create a prompt for implementation planning
-        planning_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert software architect specializing in multi-threaded applications.
-            Create a detailed implementation plan for a multi-agent system with the following components:
-            
-            1. AI User Agent - Analyzes requirements and sends requests to the Assistant Agent
-            2. Assistant Agent - Processes requests and implements solutions
-            
-            The implementation should support:
-            - Multi-threading for concurrent request handling
-            - GitHub branch management for feature isolation
-            - Document processing for requirement analysis
-            
-            Format your response as a JSON object with the following structure:
-            {
-                "phases": [
-                    {
-                        "name": "Phase name",
-                        "description": "Phase description",
-                        "tasks": [
-                            {
-                                "name": "Task name",
-                                "description": "Task description",
-                                "priority": "high|medium|low",
-                                "dependencies": ["task_id1", "task_id2"],
-                                "estimated_effort": "hours"
-                            }
-                        ]
-                    }
-                ],
-                "components": [
-                    {
-                        "name": "Component name",
-                        "description": "Component description",
-                        "files": [
-                            {
-                                "path": "file/path.py",
-                                "purpose": "File purpose"
-                            }
-                        ]
-                    }
-                ]
-            }
-            """),
-            ("human", "Requirements: {requirements}")
-        ])
-        
-        # Create a chain for implementation planning
-        planning_chain = planning_prompt | self.llm | JsonOutputParser()
-        
         # Create implementation plan
-        implementation_plan = await planning_chain.ainvoke({"requirements": json.dumps(requirements)})
+        implementation_plan = await self.planning_chain.ainvoke({"requirements": _to_prompt_json(requirements)})
         
         logger.info("Implementation plan created.")
         return implementation_plan
@@ -234,8 +248,7 @@ class AIUserAgent:
         """Save the implementation plan to a file."""
         plan_path = self.project_dir / "implementation_plan.json"
         
-        with open(plan_path, "w", encoding="utf-8") as f:
-            json.dump(implementation_plan, f, indent=2)
+        await asyncio.to_thread(plan_path.write_bytes, orjson.dumps(implementation_plan, option=orjson.OPT_INDENT_2))
         
         logger.info(f"Implementation plan saved to {plan_path}")
     
@@ -249,51 +262,56 @@ class AIUserAgent:
         Returns:
             Formatted request message
         """
+        requests = await self.formulate_assistant_requests([task_id])
+        return requests[0] if requests else ""
+    
+    async def formulate_assistant_requests(self, task_ids: List[str], max_concurrency: int = 5) -> List[str]:
+        """
+        Formulate requests for several tasks with a single batched chain call.
+        
+        Args:
+            task_ids: IDs of the tasks to implement
+            max_concurrency: Maximum number of concurrent LLM calls
+            
+        Returns:
+            Formatted request messages, in the same order as task_ids
+            (an empty string for tasks that are not in the implementation plan)
+        """
         # Load implementation plan
         plan_path = self.project_dir / "implementation_plan.json"
         if not plan_path.exists():
             logger.error("Implementation plan not found. Run initialize_project first.")
-            return ""
+            return ["" for _ in task_ids]
         
-        with open(plan_path, "r", encoding="utf-8") as f:
-            implementation_plan = json.load(f)
+        implementation_plan = orjson.loads(plan_path.read_bytes())
         
-        # Find the task in the implementation plan
-        task = None
+        # Index the tasks in the implementation plan by ID and name
+        plan_tasks = {}
         for phase in implementation_plan.get("phases", []):
             for t in phase.get("tasks", []):
-                if t.get("id") == task_id or t.get("name") == task_id:
-                    task = t
-                    break
-            if task:
-                break
-        
-        if not task:
-            logger.error(f"Task {task_id} not found in implementation plan.")
-            return ""
-        
-        # Create a prompt for request formulation
-        request_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are the AI User Agent formulating a request to the Assistant Agent.
-            Create a clear, detailed request that specifies:
-            1. The task to be implemented
-            2. Technical requirements and constraints
-            3. Expected deliverables
-            4. Any dependencies or prerequisites
-            
-            Format the request in a way that is easy for the Assistant Agent to understand and implement.
-            """),
-            ("human", "Task: {task}")
-        ])
-        
-        # Create a chain for request formulation
-        request_chain = request_prompt | self.llm | StrOutputParser()
-        
-        # Formulate request
-        request = await request_chain.ainvoke({"task": json.dumps(task)})
-        
-        logger.info(f"Request formulated for task {task_id}.")
-        return request
+                for key in (t.get("name"), t.get("id")):
+                    if key is not None:
+                        plan_tasks.setdefault(key, t)
+        
+        found_ids = []
+        for task_id in task_ids:
+            if task_id in plan_tasks:
+                found_ids.append(task_id)
+            else:
+                logger.error(f"Task {task_id} not found in implementation plan.")
+        
+        if not found_ids:
+            return ["" for _ in task_ids]
+        
+        # Formulate all requests in one batch
+        batch_requests = await self.request_chain.abatch(
+            [{"task": _to_prompt_json(plan_tasks[task_id])} for task_id in found_ids],
+            config={"max_concurrency": max_concurrency}
+        )
+        requests_by_id = dict(zip(found_ids, batch_requests))
+        
+        logger.info(f"Requests formulated for {len(found_ids)} tasks.")
+        return [requests_by_id.get(task_id, "") for task_id in task_ids]
     
     async def compare_project_state(self) -> Dict[str, Any]:
         """
@@ -312,47 +330,27 @@ class AIUserAgent:
             logger.error("Implementation plan not found. Run initialize_project first.")
             return {}
         
-        with open(plan_path, "r", encoding="utf-8") as f:
-            implementation_plan = json.load(f)
+        implementation_plan = orjson.loads(plan_path.read_bytes())
         
         # Get current project files
         project_files = []
-        for root, _, files in os.walk(self.project_dir):
-            for file in files:
-                if file.endswith((".py", ".md", ".json")):
+        # Walk in sorted order so identical trees produce identical prompts
+        for root, dirs, files in os.walk(self.project_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in EXCLUDED_PROJECT_DIRS)
+            for file in sorted(files):
+                if file.endswith((".py", ".md", ".json")) and file not in GENERATED_PROJECT_FILES:
                     rel_path = os.path.relpath(os.path.join(root, file), self.project_dir)
                     with open(os.path.join(root, file), "r", encoding="utf-8") as f:
-                        content = f.read()
-                    project_files.append({"path": rel_path, "content": content})
-        
-        # Create a prompt for project state analysis
-        analysis_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert software analyst comparing the current project state with the implementation plan.
-            Identify:
-            1. Completed tasks and components
-            2. Partially implemented features
-            3. Missing or incomplete implementations
-            4. Any deviations from the plan
-            
-            Format your response as a JSON object with the following structure:
-            {
-                "completed": ["task_id1", "task_id2"],
-                "partial": [{"task_id": "task_id3", "progress": 0.5, "missing": "description"}],
-                "missing": ["task_id4", "task_id5"],
-                "deviations": ["description of deviation"],
-                "next_steps": ["recommended next step 1", "recommended next step 2"]
-            }
-            """),
-            ("human", "Implementation Plan: {plan}\n\nProject Files: {files}")
-        ])
-        
-        # Create a chain for project state analysis
-        analysis_chain = analysis_prompt | self.llm | JsonOutputParser()
+                        content = f.read(MAX_PROJECT_FILE_CHARS + 1)
+                    project_file = {"path": rel_path, "content": content[:MAX_PROJECT_FILE_CHARS]}
+                    if len(content) > MAX_PROJECT_FILE_CHARS:
+                        project_file["truncated"] = True
+                    project_files.append(project_file)
         
         # Analyze project state
-        analysis = await analysis_chain.ainvoke({
-            "plan": json.dumps(implementation_plan),
-            "files": json.dumps(project_files)
+        analysis = await self.project_state_chain.ainvoke({
+            "plan": _to_prompt_json(implementation_plan),
+            "files": _to_prompt_json(project_files)
         })
         
         logger.info("Project state analysis complete.")
@@ -368,25 +366,9 @@ class AIUserAgent:
         Returns:
             List of formatted request messages
         """
-        # Create a prompt for further request formulation
-        request_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are the AI User Agent formulating further requests to the Assistant Agent based on project state analysis.
-            For each missing or partially implemented task, create a clear, detailed request that specifies:
-            1. The task to be implemented or completed
-            2. Technical requirements and constraints
-            3. Expected deliverables
-            4. Any dependencies or prerequisites
-            
-            Format each request in a way that is easy for the Assistant Agent to understand and implement.
-            """),
-            ("human", "Project State Analysis: {analysis}")
-        ])
-        
-        # Create a chain for further request formulation
-        request_chain = request_prompt | self.llm | StrOutputParser()
-        
         # Formulate further requests
-        requests_text = await request_chain.ainvoke({"analysis": json.dumps(analysis)})
+        remaining_work = {field: analysis.get(field, []) for field in REMAINING_WORK_FIELDS}
+        requests_text = await self.further_requests_chain.ainvoke({"analysis": _to_prompt_json(remaining_work)})
         
         # Split the text into individual requests
         requests = [req.strip() for req in requests_text.split("---") if req.strip()]
@@ -10,6 +10,7 @@ from typing import List, Dict, Any, Optional, Tuple, Callable
 from enum import Enum
 import github
 from github import Github
+from cachetools import LRUCache
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
@@ -34,14 +35,79 @@ class TaskStatus(Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+# Task priorities by their lowercase name, as used in plans and requests
+TASK_PRIORITIES = {priority.name.lower(): priority for priority in TaskPriority}
+
+# Number of task descriptions whose classified type is remembered
+TASK_TYPE_CACHE_SIZE = 1024
+
+TASK_TYPE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert task classifier. Classify the task description as one of:
+- implementation: implementing features, writing code, or changing the codebase
+- document_processing: processing, analyzing, or generating documents
+- analysis: analyzing code, requirements, or project state
+- generic: anything else
+Respond with only the task type."""),
+    ("human", "{description}")
+])
+
+IMPLEMENTATION_PLANNING_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert software engineer planning the implementation of a feature.
+List the files to create or modify, with their full content, and the tests to add or update.
+Also write a clear, concise pull request title and a detailed pull request body describing the changes.
+Respond with JSON only: {{"files": [{{"path": str, "action": "create" | "modify", "content": str}}], "tests": [{{"path": str, "content": str}}], "pull_request": {{"title": str, "body": str}}}}"""),
+    ("human", "Task Description: {description}")
+])
+
+PULL_REQUEST_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert software engineer creating a pull request.
+Write a clear, concise title and a detailed body describing the changes.
+Respond with JSON only: {{"title": str, "body": str}}"""),
+    ("human", "Task Description: {description}")
+])
+
+DOCUMENT_PROCESSING_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert document processor.
+Process the documents described in the task and generate the required output.
+Respond with JSON only: {{"processed_documents": [{{"name": str, "content": str}}], "summary": str}}"""),
+    ("human", "Task Description: {description}")
+])
+
+ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert software analyst.
+Perform the analysis described in the task and generate insights.
+Respond with JSON only: {{"analysis_type": str, "findings": [str], "recommendations": [str]}}"""),
+    ("human", "Task Description: {description}")
+])
+
+GENERIC_TASK_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert assistant processing a task.
+Provide a detailed response addressing the task requirements."""),
+    ("human", "Task Description: {description}")
+])
+
+# Task type -> (prompt, result key, output parser class)
+TASK_CONFIGS = {
+    "document_processing": (DOCUMENT_PROCESSING_PROMPT, "processing_result", JsonOutputParser),
+    "analysis": (ANALYSIS_PROMPT, "analysis_result", JsonOutputParser),
+    "generic": (GENERIC_TASK_PROMPT, "result", StrOutputParser),
+}
+
 class Task:
     """Represents a task to be processed by the Assistant Agent."""
     
+    __slots__ = (
+        "task_id", "description", "priority", "dependencies", "task_type", "rank",
+        "status", "result", "error", "branch_name", "waiting_on", "_status_lock", "_status_waiters",
+    )
+    
     def __init__(self, 
                  task_id: str,
                  description: str,
                  priority: TaskPriority = TaskPriority.MEDIUM,
-                 dependencies: List[str] = None):
+                 dependencies: List[str] = None,
+                 task_type: Optional[str] = None,
+                 rank: float = 0):
         """
         Initialize a task.
         
@@ -50,21 +116,83 @@ class Task:
             description: Description of the task
             priority: Priority level of the task
             dependencies: List of task IDs that this task depends on
+            task_type: Type of the task, if already known by the caller
+            rank: Scheduling rank among tasks of the same priority (higher runs first)
         """
         self.task_id = task_id
         self.description = description
         self.priority = priority
         self.dependencies = dependencies or []
+        self.task_type = task_type
+        self.rank = rank
         self.status = TaskStatus.PENDING
         self.result = None
         self.error = None
         self.branch_name = None
+        self.waiting_on = 0  # number of dependencies that have not completed yet
+        self._status_lock = threading.Lock()
+        self._status_waiters = []  # (event loop, asyncio.Event) pairs awaiting a status change
+    
+    @property
+    def done(self) -> bool:
+        """Whether the task has finished, successfully or not."""
+        return self.status in (TaskStatus.COMPLETED, TaskStatus.FAILED)
+    
+    def _set_status(self, status: TaskStatus):
+        """
+        Change the task's status and wake everything waiting on it.
+        
+        Waiters may live on other threads' event loops, so their events are
+        set through the owning loop.
+        
+        Args:
+            status: New status of the task
+        """
+        with self._status_lock:
+            self.status = status
+            waiters, self._status_waiters = self._status_waiters, []
+        
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+    
+    def start(self):
+        """Mark the task as picked up by a worker."""
+        self._set_status(TaskStatus.IN_PROGRESS)
+    
+    def finish(self, status: TaskStatus):
+        """
+        Move the task to a final status.
+        
+        Args:
+            status: Final status of the task (completed or failed)
+        """
+        self._set_status(status)
+    
+    async def _wait_for_status(self, reached: Callable[[], bool]):
+        """Wait until reached() holds, re-checking after every status change."""
+        while True:
+            with self._status_lock:
+                if reached():
+                    return
+                # Created lazily so the event belongs to the waiter's running loop
+                event = asyncio.Event()
+                self._status_waiters.append((asyncio.get_running_loop(), event))
+            
+            await event.wait()
+    
+    async def wait_started(self):
+        """Wait until a worker has picked the task up, or it has finished without running."""
+        await self._wait_for_status(lambda: self.status != TaskStatus.PENDING)
+    
+    async def wait_done(self):
+        """Wait until the task has completed or failed."""
+        await self._wait_for_status(lambda: self.done)
     
     def __lt__(self, other):
-        """Compare tasks based on priority for the priority queue."""
+        """Compare tasks based on priority, then rank, for the priority queue."""
         if not isinstance(other, Task):
             return NotImplemented
-        return self.priority.value > other.priority.value
+        return (self.priority.value, self.rank) > (other.priority.value, other.rank)
 
 class AssistantAgent:
     """
@@ -76,7 +204,8 @@ class AssistantAgent:
                  github_token: Optional[str] = None,
                  repo_name: Optional[str] = None,
                  model_name: str = "gpt-4o-mini",
-                 max_workers: int = 5):
+                 max_workers: int = 5,
+                 llm: Optional[ChatOpenAI] = None):
         """
         Initialize the Assistant Agent.
         
@@ -85,11 +214,23 @@ class AssistantAgent:
             repo_name: GitHub repository name (format: "owner/repo")
             model_name: LLM model to use for implementation
             max_workers: Maximum number of worker threads
+            llm: Chat model to use instead of creating one (must not be shared with other event loops)
         """
         self.model_name = model_name
-        self.llm = ChatOpenAI(model=model_name, temperature=0)
+        self.llm = llm or ChatOpenAI(model=model_name, temperature=0)
         self.max_workers = max_workers
         
+        # Chains for the task types that need no GitHub interaction
+        self.task_chains = {
+            task_type: prompt | self.llm | parser()
+            for task_type, (prompt, _, parser) in TASK_CONFIGS.items()
+        }
+        
+        # Chains for classification and implementation tasks
+        self.task_type_chain = TASK_TYPE_PROMPT | self.llm | StrOutputParser()
+        self.planning_chain = IMPLEMENTATION_PLANNING_PROMPT | self.llm | JsonOutputParser()
+        self.pr_chain = PULL_REQUEST_PROMPT | self.llm | JsonOutputParser()
+        
         # GitHub integration
         self.github_token = github_token
         self.github_client = None
@@ -101,10 +242,14 @@ class AssistantAgent:
         # Task queue and processing
         self.task_queue = queue.PriorityQueue()
         self.tasks = {}  # task_id -> Task
+        self.dependents = {}  # task_id -> pending tasks waiting on it
         self.task_lock = threading.Lock()
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
         self.workers = []
         self.running = False
+        
+        # Task type classifications, keyed by task description
+        self.task_type_cache = LRUCache(maxsize=TASK_TYPE_CACHE_SIZE)  # description -> task type, guarded by task_lock
     
     def set_repository(self, repo_name: str):
         """
@@ -176,9 +321,12 @@ class AssistantAgent:
                 # Process the task
                 task = task_item
                 
-                # Update task status
+                # Update task status, skipping tasks that are no longer pending
                 with self.task_lock:
-                    task.status = TaskStatus.IN_PROGRESS
+                    if task.status != TaskStatus.PENDING:
+                        self.task_queue.task_done()
+                        continue
+                    task.start()
                 
                 try:
                     # Process the task
@@ -187,7 +335,8 @@ class AssistantAgent:
                     # Update task with result
                     with self.task_lock:
                         task.result = result
-                        task.status = TaskStatus.COMPLETED
+                        task.finish(TaskStatus.COMPLETED)
+                        self._release_dependents(task)
                     
                     logger.info(f"Task {task.task_id} completed successfully.")
                 
@@ -195,7 +344,8 @@ class AssistantAgent:
                     # Update task with error
                     with self.task_lock:
                         task.error = str(e)
-                        task.status = TaskStatus.FAILED
+                        task.finish(TaskStatus.FAILED)
+                        self._release_dependents(task)
                     
                     logger.error(f"Error processing task {task.task_id}: {str(e)}", exc_info=True)
                 
@@ -222,19 +372,35 @@ class AssistantAgent:
         """
         logger.info(f"Processing task {task.task_id}: {task.description}")
         
-        # Parse the task description to determine the type of task
-        task_type = await self._determine_task_type(task.description)
+        # Parse the task description to determine the type of task, unless the caller already knows it
+        task_type = task.task_type or await self._determine_task_type(task.description)
         
         if task_type == "implementation":
-            # Create a branch for the implementation
-            branch_name = await self._create_branch(task.task_id)
+            # Branch creation and implementation planning are independent
+            branch_name, implementation_plan = await asyncio.gather(
+                self._create_branch(task.task_id),
+                self._plan_implementation(task.description),
+                return_exceptions=True
+            )
+            if isinstance(implementation_plan, Exception):
+                # Don't leave an empty branch behind for a task that cannot proceed
+                if not isinstance(branch_name, Exception):
+                    await self._delete_branch(branch_name)
+                raise implementation_plan
+            if isinstance(branch_name, Exception):
+                raise branch_name
             task.branch_name = branch_name
             
+            # The plan includes the PR text; only ask for it separately if it is missing
+            pr_info = implementation_plan.get("pull_request")
+            if not pr_info:
+                pr_info = await self._generate_pull_request_info(task.description)
+            
             # Implement the feature
-            implementation_result = await self._implement_feature(task.description, branch_name)
+            implementation_result = await self._implement_feature(implementation_plan, branch_name)
             
             # Create a pull request
-            pr_result = await self._create_pull_request(branch_name, task.description)
+            pr_result = await self._create_pull_request(branch_name, pr_info)
             
             return {
                 "task_type": task_type,
@@ -243,32 +409,15 @@ class AssistantAgent:
                 "pull_request": pr_result
             }
         
-        elif task_type == "document_processing":
-            # Process documents
-            processing_result = await self._process_documents(task.description)
-            
-            return {
-                "task_type": task_type,
-                "processing_result": processing_result
-            }
+        # Every other task type is a single prompt -> LLM -> parser chain
+        _, result_key, _ = TASK_CONFIGS[task_type]
+        result = await self.task_chains[task_type].ainvoke({"description": task.description})
         
-        elif task_type == "analysis":
-            # Perform analysis
-            analysis_result = await self._perform_analysis(task.description)
-            
-            return {
-                "task_type": task_type,
-                "analysis_result": analysis_result
-            }
-        
-        else:
-            # Generic task processing
-            generic_result = await self._process_generic_task(task.description)
-            
-            return {
-                "task_type": "generic",
-                "result": generic_result
-            }
+        logger.info(f"Processed {task_type} task {task.task_id}.")
+        return {
+            "task_type": task_type,
+            result_key: result
+        }
     
     async def _determine_task_type(self, description: str) -> str:
         """
@@ -280,31 +429,24 @@ class AssistantAgent:
         Returns:
             Task type (implementation, document_processing, analysis, etc.)
         """
-        # Create a prompt for task type determination
-        type_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert task classifier. Determine the type of task based on its description.
-            Task types:
-            - implementation: Tasks that involve implementing features, writing code, or making changes to the codebase
-            - document_processing: Tasks that involve processing, analyzing, or generating documents
-            - analysis: Tasks that involve analyzing code, requirements, or project state
-            - generic: Any other type of task
-            
-            Respond with only the task type, nothing else.
-            """),
-            ("human", "{description}")
-        ])
-        
-        # Create a chain for task type determination
-        type_chain = type_prompt | self.llm | StrOutputParser()
+        # Reuse the classification for descriptions we have already seen
+        with self.task_lock:
+            cached_type = self.task_type_cache.get(description)
+        if cached_type:
+            logger.info(f"Reusing cached task type: {cached_type}")
+            return cached_type
         
         # Determine task type
-        task_type = await type_chain.ainvoke({"description": description})
+        task_type = await self.task_type_chain.ainvoke({"description": description})
         
         # Normalize the task type
         task_type = task_type.strip().lower()
         if task_type not in ["implementation", "document_processing", "analysis", "generic"]:
             task_type = "generic"
         
+        with self.task_lock:
+            self.task_type_cache[description] = task_type
+        
         logger.info(f"Determined task type: {task_type}")
         return task_type
     
@@ -325,7 +467,7 @@ class AssistantAgent:
         # Generate a branch name
         branch_name = f"feature/{task_id.lower().replace(' ', '-')}-{os.urandom(4).hex()}"
         
-        try:
+        def create_git_ref():
             # Get the default branch
             default_branch = self.repo.default_branch
             
@@ -334,6 +476,10 @@ class AssistantAgent:
             
             # Create a new branch
             self.repo.create_git_ref(f"refs/heads/{branch_name}", ref.object.sha)
+        
+        try:
+            # Run the blocking GitHub calls off the event loop
+            await asyncio.to_thread(create_git_ref)
             
             logger.info(f"Created branch: {branch_name}")
             return branch_name
@@ -342,12 +488,42 @@ class AssistantAgent:
             logger.error(f"Error creating branch: {str(e)}", exc_info=True)
             raise
     
-    async def _implement_feature(self, description: str, branch_name: str) -> Dict[str, Any]:
+    async def _delete_branch(self, branch_name: str):
         """
-        Implement a feature based on the task description.
+        Delete a branch created for a task that could not be implemented.
+        
+        Args:
+            branch_name: Name of the branch to delete
+        """
+        try:
+            # Run the blocking GitHub calls off the event loop
+            await asyncio.to_thread(lambda: self.repo.get_git_ref(f"heads/{branch_name}").delete())
+            
+            logger.info(f"Deleted branch: {branch_name}")
+        
+        except Exception as e:
+            # Cleanup is best effort; the original failure is what gets reported
+            logger.error(f"Error deleting branch {branch_name}: {str(e)}", exc_info=True)
+    
+    async def _plan_implementation(self, description: str) -> Dict[str, Any]:
+        """
+        Plan the files and tests needed to implement a feature.
         
         Args:
             description: Task description
+            
+        Returns:
+            Implementation plan with "files", "tests" and "pull_request" entries
+        """
+        # Plan the implementation
+        return await self.planning_chain.ainvoke({"description": description})
+    
+    async def _implement_feature(self, implementation_plan: Dict[str, Any], branch_name: str) -> Dict[str, Any]:
+        """
+        Implement a feature by applying an implementation plan to a branch.
+        
+        Args:
+            implementation_plan: Plan returned by _plan_implementation
             branch_name: Branch to implement the feature on
             
         Returns:
@@ -357,40 +533,6 @@ class AssistantAgent:
             logger.error("GitHub repository not configured.")
             raise ValueError("GitHub repository not configured.")
         
-        # Create a prompt for implementation planning
-        planning_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert software engineer planning the implementation of a feature.
-            Based on the task description, identify:
-            1. Files that need to be created or modified
-            2. Changes to be made to each file
-            3. Tests to be added or updated
-            
-            Format your response as a JSON object with the following structure:
-            {
-                "files": [
-                    {
-                        "path": "file/path.py",
-                        "action": "create|modify",
-                        "content": "Full content for new files or changes to be made for existing files"
-                    }
-                ],
-                "tests": [
-                    {
-                        "path": "tests/file_path_test.py",
-                        "content": "Full content of the test file"
-                    }
-                ]
-            }
-            """),
-            ("human", "Task Description: {description}")
-        ])
-        
-        # Create a chain for implementation planning
-        planning_chain = planning_prompt | self.llm | JsonOutputParser()
-        
-        # Plan the implementation
-        implementation_plan = await planning_chain.ainvoke({"description": description})
-        
         # Implement the changes
         implemented_files = []
         
@@ -477,13 +619,26 @@ class AssistantAgent:
             "implementation_plan": implementation_plan
         }
     
-    async def _create_pull_request(self, branch_name: str, description: str) -> Dict[str, Any]:
+    async def _generate_pull_request_info(self, description: str) -> Dict[str, Any]:
+        """
+        Generate the title and body of a pull request.
+        
+        Args:
+            description: Task description
+            
+        Returns:
+            Dictionary with "title" and "body" entries
+        """
+        # Generate PR title and body
+        return await self.pr_chain.ainvoke({"description": description})
+    
+    async def _create_pull_request(self, branch_name: str, pr_info: Dict[str, Any]) -> Dict[str, Any]:
         """
         Create a pull request for the implemented feature.
         
         Args:
             branch_name: Branch containing the implementation
-            description: Task description
+            pr_info: Title and body returned by _generate_pull_request_info
             
         Returns:
             Pull request information
@@ -492,26 +647,6 @@ class AssistantAgent:
             logger.error("GitHub repository not configured.")
             raise ValueError("GitHub repository not configured.")
         
-        # Create a prompt for PR title and body
-        pr_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert software engineer creating a pull request.
-            Based on the task description, create a clear, concise title and a detailed body for the pull request.
-            
-            Format your response as a JSON object with the following structure:
-            {
-                "title": "PR title",
-                "body": "PR body with detailed description of changes"
-            }
-            """),
-            ("human", "Task Description: {description}")
-        ])
-        
-        # Create a chain for PR title and body
-        pr_chain = pr_prompt | self.llm | JsonOutputParser()
-        
-        # Generate PR title and body
-        pr_info = await pr_chain.ainvoke({"description": description})
-        
         try:
             # Create the pull request
             pr = self.repo.create_pull(
@@ -534,112 +669,8 @@ class AssistantAgent:
             logger.error(f"Error creating pull request: {str(e)}", exc_info=True)
             raise
     
-    async def _process_documents(self, description: str) -> Dict[str, Any]:
-        """
-        Process documents based on the task description.
-        
-        Args:
-            description: Task description
-            
-        Returns:
-            Result of document processing
-        """
-        # Create a prompt for document processing
-        processing_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert document processor.
-            Based on the task description, process the documents and generate the required output.
-            
-            Format your response as a JSON object with the following structure:
-            {
-                "processed_documents": [
-                    {
-                        "name": "Document name",
-                        "content": "Processed content"
-                    }
-                ],
-                "summary": "Summary of the processing results"
-            }
-            """),
-            ("human", "Task Description: {description}")
-        ])
-        
-        # Create a chain for document processing
-        processing_chain = processing_prompt | self.llm | JsonOutputParser()
-        
-        # Process documents
-        processing_result = await processing_chain.ainvoke({"description": description})
-        
-        logger.info(f"Processed documents: {len(processing_result.get('processed_documents', []))}")
-        return processing_result
-    
-    async def _perform_analysis(self, description: str) -> Dict[str, Any]:
-        """
-        Perform analysis based on the task description.
-        
-        Args:
-            description: Task description
-            
-        Returns:
-            Result of the analysis
-        """
-        # Create a prompt for analysis
-        analysis_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert software analyst.
-            Based on the task description, perform the required analysis and generate insights.
-            
-            Format your response as a JSON object with the following structure:
-            {
-                "analysis_type": "Type of analysis performed",
-                "findings": [
-                    "Finding 1",
-                    "Finding 2"
-                ],
-                "recommendations": [
-                    "Recommendation 1",
-                    "Recommendation 2"
-                ]
-            }
-            """),
-            ("human", "Task Description: {description}")
-        ])
-        
-        # Create a chain for analysis
-        analysis_chain = analysis_prompt | self.llm | JsonOutputParser()
-        
-        # Perform analysis
-        analysis_result = await analysis_chain.ainvoke({"description": description})
-        
-        logger.info(f"Performed analysis: {analysis_result.get('analysis_type')}")
-        return analysis_result
-    
-    async def _process_generic_task(self, description: str) -> str:
-        """
-        Process a generic task based on the description.
-        
-        Args:
-            description: Task description
-            
-        Returns:
-            Result of the task processing
-        """
-        # Create a prompt for generic task processing
-        task_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert assistant processing a task.
-            Based on the task description, provide a detailed response addressing the requirements.
-            """),
-            ("human", "Task Description: {description}")
-        ])
-        
-        # Create a chain for generic task processing
-        task_chain = task_prompt | self.llm | StrOutputParser()
-        
-        # Process the task
-        result = await task_chain.ainvoke({"description": description})
-        
-        logger.info("Processed generic task.")
-        return result
-    
-    def add_task(self, task_id: str, description: str, priority: str = "medium", dependencies: List[str] = None) -> Task:
+    def add_task(self, task_id: str, description: str, priority: str = "medium", dependencies: List[str] = None,
+                 task_type: Optional[str] = None, rank: float = 0) -> Task:
         """
         Add a task to the queue.
         
@@ -648,43 +679,56 @@ class AssistantAgent:
             description: Description of the task
             priority: Priority level of the task (high, medium, low)
             dependencies: List of task IDs that this task depends on
+            task_type: Type of the task (implementation, document_processing, analysis, generic);
+                determined from the description when omitted
+            rank: Scheduling rank among tasks of the same priority, e.g. the task's
+                critical-path length (higher runs first)
             
         Returns:
             The created task
         """
         # Convert priority string to enum
-        priority_enum = TaskPriority.MEDIUM
-        if priority.lower() == "high":
-            priority_enum = TaskPriority.HIGH
-        elif priority.lower() == "low":
-            priority_enum = TaskPriority.LOW
+        priority_enum = TASK_PRIORITIES.get(priority.lower(), TaskPriority.MEDIUM)
         
         # Create the task
         task = Task(
             task_id=task_id,
             description=description,
             priority=priority_enum,
-            dependencies=dependencies
+            dependencies=dependencies,
+            task_type=task_type,
+            rank=rank
         )
         
         # Store the task
         with self.task_lock:
             self.tasks[task_id] = task
-        
-        # Check if all dependencies are satisfied
-        can_queue = True
-        if dependencies:
-            for dep_id in dependencies:
-                if dep_id not in self.tasks or self.tasks[dep_id].status != TaskStatus.COMPLETED:
-                    can_queue = False
-                    break
-        
-        # Add to queue if dependencies are satisfied
-        if can_queue:
-            self.task_queue.put(task)
+            
+            # A task can never run once one of its dependencies has failed
+            failed_dep = self._failed_dependency(task)
+            if failed_dep:
+                task.error = f"Dependency {failed_dep} failed"
+                task.finish(TaskStatus.FAILED)
+                self._release_dependents(task)
+            else:
+                # Wait on every dependency that has not completed yet
+                for dep_id in task.dependencies:
+                    dep = self.tasks.get(dep_id)
+                    if not dep or dep.status != TaskStatus.COMPLETED:
+                        task.waiting_on += 1
+                        self.dependents.setdefault(dep_id, []).append(task)
+                
+                # Add to queue if dependencies are satisfied
+                if task.waiting_on == 0:
+                    self.task_queue.put(task)
+            waiting_on = task.waiting_on
+        
+        if failed_dep:
+            logger.warning(f"Task {task_id} failed because dependency {failed_dep} failed.")
+        elif waiting_on == 0:
             logger.info(f"Added task {task_id} to queue with priority {priority}.")
         else:
-            logger.info(f"Task {task_id} waiting for dependencies.")
+            logger.info(f"Task {task_id} waiting for {waiting_on} dependencies.")
         
         return task
     
@@ -737,19 +781,47 @@ class AssistantAgent:
                 for task in self.tasks.values()
             ]
     
-    def check_dependencies(self):
-        """Check for tasks with satisfied dependencies and add them to the queue."""
-        with self.task_lock:
-            for task_id, task in self.tasks.items():
-                if task.status == TaskStatus.PENDING:
-                    # Check if all dependencies are satisfied
-                    can_queue = True
-                    for dep_id in task.dependencies:
-                        if dep_id not in self.tasks or self.tasks[dep_id].status != TaskStatus.COMPLETED:
-                            can_queue = False
-                            break
-                    
-                    # Add to queue if dependencies are satisfied
-                    if can_queue:
-                        self.task_queue.put(task)
-                        logger.info(f"Added task {task_id} to queue after dependencies were satisfied.")
\ No newline at end of file
+    def _failed_dependency(self, task: Task) -> Optional[str]:
+        """
+        Find a dependency of a task that has failed.
+        
+        Args:
+            task: Task whose dependencies to check
+            
+        Returns:
+            ID of the first failed dependency, or None if no dependency has failed
+        """
+        for dep_id in task.dependencies:
+            dep = self.tasks.get(dep_id)
+            if dep and dep.status == TaskStatus.FAILED:
+                return dep_id
+        return None
+    
+    def _release_dependents(self, task: Task):
+        """
+        Update the tasks waiting on a finished task. Must be called with task_lock held.
+        
+        Dependents are queued once all of their dependencies have completed; if the
+        task failed, its dependents (and theirs, transitively) fail as well.
+        
+        Args:
+            task: Task that has just completed or failed
+        """
+        finished = [task]
+        while finished:
+            parent = finished.pop()
+            for child in self.dependents.pop(parent.task_id, []):
+                if child.status != TaskStatus.PENDING:
+                    continue
+                
+                if parent.status == TaskStatus.FAILED:
+                    child.error = f"Dependency {parent.task_id} failed"
+                    child.finish(TaskStatus.FAILED)
+                    finished.append(child)
+                    logger.warning(f"Task {child.task_id} failed because dependency {parent.task_id} failed.")
+                    continue
+                
+                child.waiting_on -= 1
+                if child.waiting_on == 0:
+                    self.task_queue.put(child)
+                    logger.info(f"Added task {child.task_id} to queue after dependencies were satisfied.")
\ No newline at end of file
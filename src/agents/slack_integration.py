@@ -2,12 +2,11 @@ import os
 import re
 import json
 import logging
-import asyncio
-import threading
 import uuid
 from typing import Dict, Any, List, Optional, Callable
-from slack_sdk import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
 from slack_sdk.errors import SlackApiError
+from langchain_openai import ChatOpenAI
 from .ai_user_agent import AIUserAgent
 from .assistant_agent import AssistantAgent, Task
 
@@ -18,6 +17,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Mention markup for this bot, stripped from incoming app mentions
+BOT_MENTION = f"<@{os.environ.get('SLACK_BOT_ID', '')}>"
+
+# Built-in app mention routes, checked in order (pattern, handler method name)
+MENTION_ROUTES = [
+    (re.compile(r"\b(add|create|register)\s+project\b", re.IGNORECASE), "_handle_project_management"),
+    (re.compile(r"\b(initialize|init|start|create)\s+project\b", re.IGNORECASE), "_handle_project_initialization"),
+    (re.compile(r"\b(implement|add|create|develop)\s+(feature|task|component)\b", re.IGNORECASE), "_handle_task_request"),
+    (re.compile(r"\b(analyze|check|compare|status)\s+(project|state)\b", re.IGNORECASE), "_handle_project_state_analysis"),
+    (re.compile(r"\b(status|progress)\s+(of|for)\s+task\b", re.IGNORECASE), "_handle_task_status_request"),
+    (re.compile(r"\b(proceed|execute|run|start)\s+(with|the)?\s*implementation\s+phases\b", re.IGNORECASE), "_handle_implementation_phases"),
+]
+
+# Argument extraction patterns used by the handlers
+PROJECT_NAME_PATTERN = re.compile(r"\b(project|name)[:\s]+([a-zA-Z0-9_-]+)", re.IGNORECASE)
+REPO_PATTERN = re.compile(r"\b(repo|repository|url)[:\s]+(https?://[^\s]+|[a-zA-Z0-9_-]+/[a-zA-Z0-9_-]+)", re.IGNORECASE)
+TASK_REQUEST_PATTERN = re.compile(r"\b(implement|add|create|develop)\s+(feature|task|component)\s+(.+?)(?:\s+for\s+project\s+([a-zA-Z0-9_-]+))?$", re.IGNORECASE)
+TASK_STATUS_PATTERN = re.compile(r"\b(status|progress)\s+(of|for)\s+task\s+([a-zA-Z0-9_-]+)", re.IGNORECASE)
+
 class SlackIntegration:
     """
     Integration between AI User Agent, Assistant Agent, and Slack.
@@ -44,7 +62,7 @@ class SlackIntegration:
             project_dir: Directory containing project files
             max_workers: Maximum number of worker threads
         """
-        self.slack_client = WebClient(token=slack_bot_token)
+        self.slack_client = AsyncWebClient(token=slack_bot_token)
         self.slack_bot_token = slack_bot_token
         self.slack_app_token = slack_app_token
         
@@ -53,11 +71,17 @@ class SlackIntegration:
         if repo_name:  # For backward compatibility
             self.add_project("default", repo_name)
         
+        # Chat model for the AI User Agent. The Assistant Agent creates its own because
+        # its workers call the model from their own event loops, and an async
+        # connection pool cannot be shared across loops.
+        self.llm = ChatOpenAI(model=model_name, temperature=0)
+        
         # Initialize agents
         self.ai_user_agent = AIUserAgent(
             project_dir=project_dir,
             github_token=github_token,
-            model_name=model_name
+            model_name=model_name,
+            llm=self.llm
         )
         
         self.assistant_agent = AssistantAgent(
@@ -66,10 +90,12 @@ class SlackIntegration:
             max_workers=max_workers
         )
         
+        # Implementation phases, created on first use and reused across requests
+        self.implementation_phases = None
+        
         # Message handling
         self.message_handlers = {}
         self.running = False
-        self.message_thread = None
     
     def add_project(self, project_name: str, repo_url: str):
         """
@@ -126,14 +152,6 @@ class SlackIntegration:
         # Start the Assistant Agent
         self.assistant_agent.start()
         
-        # Start message processing thread
-        self.message_thread = threading.Thread(
-            target=self._message_processing_thread,
-            name="SlackMessageProcessor",
-            daemon=True
-        )
-        self.message_thread.start()
-        
         logger.info("Slack integration started.")
     
     def stop(self):
@@ -143,26 +161,8 @@ class SlackIntegration:
         # Stop the Assistant Agent
         self.assistant_agent.stop()
         
-        # Wait for message thread to finish
-        if self.message_thread:
-            self.message_thread.join(timeout=5.0)
-        
-        self.message_thread = None
         logger.info("Slack integration stopped.")
     
-    def _message_processing_thread(self):
-        """Thread for processing messages from Slack."""
-        while self.running:
-            try:
-                # Process any pending tasks
-                self.assistant_agent.check_dependencies()
-                
-                # Sleep to avoid busy waiting
-                asyncio.run(asyncio.sleep(1.0))
-            
-            except Exception as e:
-                logger.error(f"Error in message processing thread: {str(e)}", exc_info=True)
-    
     def register_message_handler(self, pattern: str, handler: Callable):
         """
         Register a handler for messages matching a pattern.
@@ -171,7 +171,7 @@ class SlackIntegration:
             pattern: Regular expression pattern to match messages
             handler: Function to handle matching messages
         """
-        self.message_handlers[pattern] = handler
+        self.message_handlers[re.compile(pattern, re.IGNORECASE)] = handler
         logger.info(f"Registered message handler for pattern: {pattern}")
     
     async def handle_app_mention(self, event: Dict[str, Any]):
@@ -188,47 +188,20 @@ class SlackIntegration:
             text = event["text"]
             
             # Remove the bot mention from the text
-            bot_id = os.environ.get("SLACK_BOT_ID", "")
-            text = text.replace(f"<@{bot_id}>", "").strip()
+            text = text.replace(BOT_MENTION, "", 1).strip()
             
             logger.info(f"Received app mention: {text}")
             
-            # Get thread history for context
-            thread_history = await self._get_thread_history(channel_id, thread_ts)
-            
-            # Check if this is a project management request
-            if re.search(r"\b(add|create|register)\s+project\b", text, re.IGNORECASE):
-                await self._handle_project_management(channel_id, thread_ts, text)
-                return
-            
-            # Check if this is a project initialization request
-            if re.search(r"\b(initialize|init|start|create)\s+project\b", text, re.IGNORECASE):
-                await self._handle_project_initialization(channel_id, thread_ts, text)
-                return
-            
-            # Check if this is a task request
-            if re.search(r"\b(implement|add|create|develop)\s+(feature|task|component)\b", text, re.IGNORECASE):
-                await self._handle_task_request(channel_id, thread_ts, text)
-                return
-            
-            # Check if this is a project state analysis request
-            if re.search(r"\b(analyze|check|compare|status)\s+(project|state)\b", text, re.IGNORECASE):
-                await self._handle_project_state_analysis(channel_id, thread_ts, text)
-                return
-            
-            # Check if this is a task status request
-            if re.search(r"\b(status|progress)\s+(of|for)\s+task\b", text, re.IGNORECASE):
-                await self._handle_task_status_request(channel_id, thread_ts, text)
-                return
-            
-            # Check if this is an implementation phases request
-            if re.search(r"\b(proceed|execute|run|start)\s+(with|the)?\s*implementation\s+phases\b", text, re.IGNORECASE):
-                await self._handle_implementation_phases(channel_id, thread_ts, text)
-                return
+            # Route to the first built-in handler whose pattern matches
+            for pattern, handler_name in MENTION_ROUTES:
+                if pattern.search(text):
+                    await getattr(self, handler_name)(channel_id, thread_ts, text)
+                    return
             
-            # Check for custom message handlers
+            # Check for custom message handlers, the only ones that need the thread history
             for pattern, handler in self.message_handlers.items():
-                if re.search(pattern, text, re.IGNORECASE):
+                if pattern.search(text):
+                    thread_history = await self._get_thread_history(channel_id, thread_ts)
                     await handler(channel_id, thread_ts, text, thread_history)
                     return
             
@@ -264,8 +237,8 @@ class SlackIntegration:
             text: Message text
         """
         # Extract project name and repository URL
-        project_match = re.search(r"\b(project|name)[:\s]+([a-zA-Z0-9_-]+)", text, re.IGNORECASE)
-        repo_match = re.search(r"\b(repo|repository|url)[:\s]+(https?://[^\s]+|[a-zA-Z0-9_-]+/[a-zA-Z0-9_-]+)", text, re.IGNORECASE)
+        project_match = PROJECT_NAME_PATTERN.search(text)
+        repo_match = REPO_PATTERN.search(text)
         
         if not project_match or not repo_match:
             await self._send_slack_message(
@@ -298,7 +271,7 @@ class SlackIntegration:
             text: Message text
         """
         # Extract project name if specified
-        project_match = re.search(r"\b(project|name)[:\s]+([a-zA-Z0-9_-]+)", text, re.IGNORECASE)
+        project_match = PROJECT_NAME_PATTERN.search(text)
         project_name = project_match.group(2) if project_match else None
         
         # Get the project
@@ -318,7 +291,7 @@ class SlackIntegration:
                 )
             return
         
-        await self._send_slack_message(
+        status_message = await self._send_slack_message(
             channel_id=channel_id,
             text="Initializing project... This may take a few minutes.",
             thread_ts=thread_ts
@@ -332,10 +305,10 @@ class SlackIntegration:
             implementation_plan = await self.ai_user_agent.initialize_project()
             
             if not implementation_plan:
-                await self._send_slack_message(
+                await self._update_slack_message(
                     channel_id=channel_id,
                     text="Project initialization failed. No requirement documents found.",
-                    thread_ts=thread_ts
+                    ts=status_message["ts"]
                 )
                 return
             
@@ -359,19 +332,19 @@ class SlackIntegration:
             for i, component in enumerate(components):
                 message += f"*{i+1}. {component.get('name')}*: {component.get('description')}\n"
             
-            await self._send_slack_message(
+            await self._update_slack_message(
                 channel_id=channel_id,
                 text=message,
-                thread_ts=thread_ts
+                ts=status_message["ts"]
             )
         
         except Exception as e:
             logger.error(f"Error initializing project: {str(e)}", exc_info=True)
             
-            await self._send_slack_message(
+            await self._update_slack_message(
                 channel_id=channel_id,
                 text=f"An error occurred during project initialization: {str(e)}",
-                thread_ts=thread_ts
+                ts=status_message["ts"]
             )
     
     async def _handle_implementation_phases(self, channel_id: str, thread_ts: str, text: str):
@@ -384,7 +357,7 @@ class SlackIntegration:
             text: Message text
         """
         # Extract project name if specified
-        project_match = re.search(r"\b(project|name)[:\s]+([a-zA-Z0-9_-]+)", text, re.IGNORECASE)
+        project_match = PROJECT_NAME_PATTERN.search(text)
         project_name = project_match.group(2) if project_match else None
         
         # Get the project
@@ -404,25 +377,43 @@ class SlackIntegration:
                 )
             return
         
-        await self._send_slack_message(
+        progress_text = "Proceeding with implementation phases... This may take some time."
+        progress_message = await self._send_slack_message(
             channel_id=channel_id,
-            text="Proceeding with implementation phases... This may take some time.",
+            text=progress_text,
             thread_ts=thread_ts
         )
         
+        async def report_progress(phase_summary: str):
+            """Edit the progress message in place as each phase completes."""
+            nonlocal progress_text
+            progress_text += f"\n- {phase_summary}"
+            try:
+                await self._update_slack_message(
+                    channel_id=channel_id,
+                    ts=progress_message["ts"],
+                    text=progress_text
+                )
+            except SlackApiError:
+                # Progress updates are best effort; the final summary is still posted
+                pass
+        
         try:
-            # Import here to avoid circular imports
-            from implementation_phases import ImplementationPhases
-            
-            # Create implementation phases instance
-            implementation_phases = ImplementationPhases(
-                ai_user_agent=self.ai_user_agent,
-                assistant_agent=self.assistant_agent,
-                project_dir=self.ai_user_agent.project_dir
-            )
+            if self.implementation_phases is None:
+                # Import here to avoid circular imports
+                from implementation_phases import ImplementationPhases
+                
+                self.implementation_phases = ImplementationPhases(
+                    ai_user_agent=self.ai_user_agent,
+                    assistant_agent=self.assistant_agent,
+                    project_dir=self.ai_user_agent.project_dir
+                )
             
             # Execute all phases
-            results = await implementation_phases.execute_all_phases(project["repo_name"])
+            results = await self.implementation_phases.execute_all_phases(
+                project["repo_name"],
+                progress_callback=report_progress
+            )
             
             # Format the results for Slack
             message = "Implementation phases completed successfully! Here's a summary:\n\n"
@@ -458,19 +449,19 @@ class SlackIntegration:
             # Add link to results file
             message += "\nDetailed results have been saved to implementation_phases_results.json"
             
-            await self._send_slack_message(
+            await self._update_slack_message(
                 channel_id=channel_id,
                 text=message,
-                thread_ts=thread_ts
+                ts=progress_message["ts"]
             )
         
         except Exception as e:
             logger.error(f"Error executing implementation phases: {str(e)}", exc_info=True)
             
-            await self._send_slack_message(
+            await self._update_slack_message(
                 channel_id=channel_id,
                 text=f"An error occurred during implementation phases: {str(e)}",
-                thread_ts=thread_ts
+                ts=progress_message["ts"]
             )
     
     async def _handle_task_request(self, channel_id: str, thread_ts: str, text: str):
@@ -483,7 +474,7 @@ class SlackIntegration:
             text: Message text
         """
         # Extract task details
-        task_match = re.search(r"\b(implement|add|create|develop)\s+(feature|task|component)\s+(.+?)(?:\s+for\s+project\s+([a-zA-Z0-9_-]+))?$", text, re.IGNORECASE)
+        task_match = TASK_REQUEST_PATTERN.search(text)
         
         if not task_match:
             await self._send_slack_message(
@@ -516,9 +507,9 @@ class SlackIntegration:
             return
         
         # Generate a unique task ID
-        task_id = f"{task_type.lower()}-{str(uuid.uuid4())[:8]}"
+        task_id = f"{task_type.lower()}-{uuid.uuid4()!s:.8}"
         
-        await self._send_slack_message(
+        status_message = await self._send_slack_message(
             channel_id=channel_id,
             text=f"Adding task '{task_description}' with ID '{task_id}'...",
             thread_ts=thread_ts
@@ -529,7 +520,8 @@ class SlackIntegration:
             task = self.assistant_agent.add_task(
                 task_id=task_id,
                 description=f"Implement {task_type}: {task_description}",
-                priority="medium"
+                priority="medium",
+                task_type="implementation"
             )
             
             # Store the task in the project
@@ -541,19 +533,19 @@ class SlackIntegration:
                 "thread_ts": thread_ts
             }
             
-            await self._send_slack_message(
+            await self._update_slack_message(
                 channel_id=channel_id,
                 text=f"Task '{task_id}' added successfully. You can check its status with `@bot what's the status of task {task_id}?`",
-                thread_ts=thread_ts
+                ts=status_message["ts"]
             )
         
         except Exception as e:
             logger.error(f"Error adding task: {str(e)}", exc_info=True)
             
-            await self._send_slack_message(
+            await self._update_slack_message(
                 channel_id=channel_id,
                 text=f"An error occurred while adding the task: {str(e)}",
-                thread_ts=thread_ts
+                ts=status_message["ts"]
             )
     
     async def _handle_project_state_analysis(self, channel_id: str, thread_ts: str, text: str):
@@ -566,7 +558,7 @@ class SlackIntegration:
             text: Message text
         """
         # Extract project name if specified
-        project_match = re.search(r"\b(project|name)[:\s]+([a-zA-Z0-9_-]+)", text, re.IGNORECASE)
+        project_match = PROJECT_NAME_PATTERN.search(text)
         project_name = project_match.group(2) if project_match else None
         
         # Get the project
@@ -586,7 +578,7 @@ class SlackIntegration:
                 )
             return
         
-        await self._send_slack_message(
+        status_message = await self._send_slack_message(
             channel_id=channel_id,
             text="Analyzing project state... This may take a few minutes.",
             thread_ts=thread_ts
@@ -633,19 +625,19 @@ class SlackIntegration:
             for step in next_steps:
                 message += f"- {step}\n"
             
-            await self._send_slack_message(
+            await self._update_slack_message(
                 channel_id=channel_id,
                 text=message,
-                thread_ts=thread_ts
+                ts=status_message["ts"]
             )
         
         except Exception as e:
             logger.error(f"Error analyzing project state: {str(e)}", exc_info=True)
             
-            await self._send_slack_message(
+            await self._update_slack_message(
                 channel_id=channel_id,
                 text=f"An error occurred during project state analysis: {str(e)}",
-                thread_ts=thread_ts
+                ts=status_message["ts"]
             )
     
     async def _handle_task_status_request(self, channel_id: str, thread_ts: str, text: str):
@@ -658,7 +650,7 @@ class SlackIntegration:
             text: Message text
         """
         # Extract task ID
-        task_match = re.search(r"\b(status|progress)\s+(of|for)\s+task\s+([a-zA-Z0-9_-]+)", text, re.IGNORECASE)
+        task_match = TASK_STATUS_PATTERN.search(text)
         
         if not task_match:
             await self._send_slack_message(
@@ -734,7 +726,7 @@ class SlackIntegration:
             List of messages in the thread
         """
         try:
-            response = self.slack_client.conversations_replies(
+            response = await self.slack_client.conversations_replies(
                 channel=channel_id,
                 ts=thread_ts,
                 inclusive=True
@@ -766,7 +758,7 @@ class SlackIntegration:
             Response from Slack API
         """
         try:
-            response = self.slack_client.chat_postMessage(
+            response = await self.slack_client.chat_postMessage(
                 channel=channel_id,
                 text=text,
                 thread_ts=thread_ts
@@ -776,4 +768,29 @@ class SlackIntegration:
         
         except SlackApiError as e:
             logger.error(f"Error sending Slack message: {str(e)}", exc_info=True)
+            raise
+    
+    async def _update_slack_message(self, channel_id: str, ts: str, text: str) -> Dict[str, Any]:
+        """
+        Update a previously sent Slack message.
+        
+        Args:
+            channel_id: Slack channel ID
+            ts: Timestamp of the message to update
+            text: New message text
+            
+        Returns:
+            Response from Slack API
+        """
+        try:
+            response = await self.slack_client.chat_update(
+                channel=channel_id,
+                ts=ts,
+                text=text
+            )
+            
+            return response
+        
+        except SlackApiError as e:
+            logger.error(f"Error updating Slack message: {str(e)}", exc_info=True)
             raise
\ No newline at end of file
@@ -11,11 +11,13 @@ Each phase has specific methods and utilities to support its functionality.
 """
 
 import os
-import json
 import logging
 import asyncio
+import heapq
+from collections import Counter
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+import orjson
 from agents.ai_user_agent import AIUserAgent
 from agents.assistant_agent import AssistantAgent, Task, TaskPriority
 
@@ -26,6 +28,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Seconds phase 2 waits for a single dispatched task before giving up on it
+DEFAULT_TASK_TIMEOUT = 3600.0
+
+def _load_json(path: Path) -> Any:
+    """Load a JSON file (read once per instance, when no plan is held yet)."""
+    return orjson.loads(path.read_bytes())
+
+def _write_json(path: Path, data: Any):
+    """Write data to a file as indented JSON (run via asyncio.to_thread from the phases)."""
+    path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+def _write_json_sections(path: Path, sections: Dict[str, Any]):
+    """
+    Write a dict as an indented JSON object one top-level section at a time.
+    
+    Only one section is held in memory as serialized bytes, rather than the
+    whole document. The output matches _write_json for the same dict.
+    """
+    with open(path, "wb") as f:
+        f.write(b"{")
+        for index, (key, value) in enumerate(sections.items()):
+            f.write(b",\n  " if index else b"\n  ")
+            f.write(orjson.dumps(key) + b": ")
+            # Re-indent the section one level; JSON strings never contain raw newlines
+            f.write(orjson.dumps(value, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n  "))
+        f.write(b"\n}" if sections else b"}")
+
 class ImplementationPhases:
     """
     Implementation phases for the Multi-Threaded Agentic Slackbot.
@@ -50,6 +79,38 @@ class ImplementationPhases:
         self.assistant_agent = assistant_agent
         self.project_dir = Path(project_dir)
         self.implementation_plan = None
+        self.plan_parents = {}  # task name -> names of the tasks it depends on
+        self.plan_children = {}  # task name -> names of the tasks depending on it
+        # Runs share the plan and its index above, so only one may be in progress at a time
+        self._run_lock = asyncio.Lock()
+    
+    def _set_implementation_plan(self, implementation_plan: Dict[str, Any]):
+        """
+        Store the implementation plan and index its task dependency graph.
+        
+        Args:
+            implementation_plan: Implementation plan as a dictionary
+        """
+        self.implementation_plan = implementation_plan
+        plan_tasks = [
+            task
+            for phase in (implementation_plan or {}).get("phases", [])
+            for task in phase.get("tasks", [])
+        ]
+        
+        self.plan_parents = {}
+        self.plan_children = {task.get("name"): [] for task in plan_tasks}
+        for task in plan_tasks:
+            name = task.get("name")
+            dependencies = []
+            for dep in task.get("dependencies", ()):
+                # Only index dependencies on tasks that exist in the plan
+                if dep not in self.plan_children:
+                    logger.warning(f"Ignoring unknown dependency {dep} of task {name}.")
+                    continue
+                dependencies.append(dep)
+                self.plan_children[dep].append(name)
+            self.plan_parents[name] = dependencies
         
     async def phase1_project_initialization(self, repo_name: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -71,15 +132,18 @@ class ImplementationPhases:
         # Set repository if provided
         if repo_name:
             self.ai_user_agent.set_repository(repo_name)
+            self.assistant_agent.set_repository(repo_name)
         
         # Initialize the project
         implementation_plan = await self.ai_user_agent.initialize_project()
-        self.implementation_plan = implementation_plan
+        self._set_implementation_plan(implementation_plan)
         
         logger.info("Completed Phase 1: Project Initialization")
         return implementation_plan
     
-    async def phase2_development_cycle(self, task_ids: List[str] = None) -> List[Dict[str, Any]]:
+    async def phase2_development_cycle(self,
+                                       task_ids: List[str] = None,
+                                       task_timeout: Optional[float] = DEFAULT_TASK_TIMEOUT) -> List[Dict[str, Any]]:
         """
         Execute Phase 2: Development Cycle.
         
@@ -91,6 +155,8 @@ class ImplementationPhases:
         
         Args:
             task_ids: List of task IDs to implement (if None, uses all tasks from phase 1)
+            task_timeout: Seconds to wait for each task once a worker has started it,
+                before giving up on it (None waits indefinitely)
             
         Returns:
             List of task results
@@ -104,8 +170,7 @@ class ImplementationPhases:
                 logger.error("Implementation plan not found. Run phase1_project_initialization first.")
                 return []
             
-            with open(plan_path, "r", encoding="utf-8") as f:
-                self.implementation_plan = json.load(f)
+            self._set_implementation_plan(_load_json(plan_path))
         
         # Get tasks from implementation plan
         all_tasks = []
@@ -114,39 +179,132 @@ class ImplementationPhases:
         
         # Filter tasks if task_ids is provided
         if task_ids:
-            tasks_to_implement = [
-                task for task in all_tasks 
-                if task.get("id") == task_id or task.get("name") == task_id
-                for task_id in task_ids
-            ]
+            # Index plan tasks by ID and name, then pick the requested ones in order
+            by_id = {}
+            for task in all_tasks:
+                for key in (task.get("id"), task.get("name")):
+                    if key is not None:
+                        by_id.setdefault(key, task)
+            tasks_to_implement = [by_id[task_id] for task_id in dict.fromkeys(task_ids) if task_id in by_id]
         else:
             tasks_to_implement = all_tasks
         
-        # Formulate requests and add tasks to the assistant agent
-        task_results = []
-        for task in tasks_to_implement:
-            # Formulate request
-            request = await self.ai_user_agent.formulate_assistant_request(task.get("name"))
-            
-            # Add task to assistant agent
-            priority = task.get("priority", "medium").lower()
-            dependencies = task.get("dependencies", [])
+        # Formulate all requests in one batch
+        requests = await self.ai_user_agent.formulate_assistant_requests(
+            [task.get("name") for task in tasks_to_implement]
+        )
+        
+        # Build the dependency DAG between the tasks being implemented
+        tasks_by_name = {}
+        requests_by_name = {}
+        for task, request in zip(tasks_to_implement, requests):
+            name = task.get("name")
+            tasks_by_name[name] = task
+            requests_by_name[name] = request
+        
+        children = {
+            name: [child for child in self.plan_children.get(name, ()) if child in tasks_by_name]
+            for name in tasks_by_name
+        }
+        wait_counts = {
+            name: sum(1 for dep in self.plan_parents.get(name, ()) if dep in tasks_by_name)
+            for name in tasks_by_name
+        }
+        
+        # Bottom level of each task: length of the longest chain of tasks depending on it
+        bottom_levels = {}
+        
+        def bottom_level(name: str, visiting: frozenset = frozenset()) -> int:
+            """Memoized bottom level; visiting guards against dependency cycles."""
+            if name not in bottom_levels:
+                bottom_levels[name] = 1 + max(
+                    (bottom_level(child, visiting | {name}) for child in children[name] if child not in visiting),
+                    default=0
+                )
+            return bottom_levels[name]
+        
+        # Ready tasks are dispatched critical path first, then in plan order
+        order = {name: index for index, name in enumerate(tasks_by_name)}
+        ready = []
+        
+        def make_ready(name: str):
+            """Queue a task whose dependencies have all finished."""
+            heapq.heappush(ready, (-bottom_level(name), order[name], name))
+        
+        in_flight = {}  # asyncio task awaiting completion -> task name
+        
+        def finished_dependency(dep: str) -> bool:
+            """Whether a dependency has finished, so the assistant agent will never wait on it."""
+            if dep in tasks_by_name:
+                # Tasks in this run are only dispatched once their dependencies have finished
+                return True
+            dep_status = self.assistant_agent.get_task_status(dep)
+            return bool(dep_status) and dep_status["status"] in ("completed", "failed")
+        
+        def dispatch(name: str):
+            """Hand a task whose dependencies have finished to the assistant agent."""
+            task = tasks_by_name[name]
+            dependencies = []
+            for dep in self.plan_parents.get(name, ()):
+                if finished_dependency(dep):
+                    dependencies.append(dep)
+                else:
+                    logger.warning(f"Task {name} depends on {dep}, which is not part of this run and has not finished; ignoring it.")
             
             assistant_task = self.assistant_agent.add_task(
-                task_id=task.get("name"),
-                description=request,
-                priority=priority,
-                dependencies=dependencies
+                task_id=name,
+                description=requests_by_name[name],
+                priority=task.get("priority", "medium"),
+                dependencies=dependencies,
+                task_type=task.get("task_type"),  # None lets the assistant agent classify the task
+                rank=bottom_level(name)
             )
+            in_flight[asyncio.ensure_future(wait_finished(assistant_task))] = name
+        
+        async def wait_finished(assistant_task: Task) -> bool:
+            """
+            Wait for a dispatched task, timing it from when a worker starts it.
             
-            # Wait for task to complete
-            while assistant_task.status.value != "completed" and assistant_task.status.value != "failed":
-                await asyncio.sleep(1.0)
-                self.assistant_agent.check_dependencies()
-            
-            # Get task result
-            task_result = self.assistant_agent.get_task_status(task.get("name"))
-            task_results.append(task_result)
+            Returns:
+                False if the task ran longer than task_timeout, True otherwise
+            """
+            # Time spent queued behind other tasks does not count towards the timeout
+            await assistant_task.wait_started()
+            try:
+                await asyncio.wait_for(assistant_task.wait_done(), task_timeout)
+            except asyncio.TimeoutError:
+                return False
+            return True
+        
+        for name, count in wait_counts.items():
+            if count == 0:
+                make_ready(name)
+        while ready:
+            dispatch(heapq.heappop(ready)[2])
+        
+        # Run independent tasks in parallel, releasing children as their parents finish
+        results_by_name = {}
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                name = in_flight.pop(future)
+                results_by_name[name] = self.assistant_agent.get_task_status(name)
+                if not future.result():
+                    # Its dependents are never dispatched
+                    logger.warning(f"Gave up waiting for task {name} after {task_timeout} seconds of work.")
+                    continue
+                for child in children[name]:
+                    wait_counts[child] -= 1
+                    if wait_counts[child] == 0:
+                        make_ready(child)
+            while ready:
+                dispatch(heapq.heappop(ready)[2])
+        
+        for name in tasks_by_name:
+            if name not in results_by_name:
+                logger.warning(f"Task {name} was not dispatched because its dependencies never finished or form a cycle.")
+        
+        task_results = [results_by_name[name] for name in tasks_by_name if name in results_by_name]
         
         logger.info(f"Completed Phase 2: Development Cycle - {len(task_results)} tasks processed")
         return task_results
@@ -169,28 +327,32 @@ class ImplementationPhases:
         # Get all tasks
         all_tasks = self.assistant_agent.get_all_tasks()
         
+        # Count statuses and group tasks by priority in a single pass
+        status_counts = Counter()
+        tasks_by_priority_name = {priority.name: [] for priority in TaskPriority}
+        for task in all_tasks:
+            status_counts[task.get("status")] += 1
+            priority_tasks = tasks_by_priority_name.get(task.get("priority"))
+            if priority_tasks is not None:
+                priority_tasks.append(task)
+        tasks_by_priority = {name.lower(): tasks for name, tasks in tasks_by_priority_name.items()}
+        
         # Calculate metrics
         total_tasks = len(all_tasks)
-        completed_tasks = sum(1 for task in all_tasks if task.get("status") == "completed")
-        failed_tasks = sum(1 for task in all_tasks if task.get("status") == "failed")
-        pending_tasks = sum(1 for task in all_tasks if task.get("status") == "pending")
-        in_progress_tasks = sum(1 for task in all_tasks if task.get("status") == "in_progress")
+        completed_tasks = status_counts["completed"]
+        failed_tasks = status_counts["failed"]
+        pending_tasks = status_counts["pending"]
+        in_progress_tasks = status_counts["in_progress"]
         
         completion_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
         
-        # Group tasks by priority
-        tasks_by_priority = {
-            "high": [task for task in all_tasks if task.get("priority") == "HIGH"],
-            "medium": [task for task in all_tasks if task.get("priority") == "MEDIUM"],
-            "low": [task for task in all_tasks if task.get("priority") == "LOW"]
-        }
-        
         # Identify blocked tasks
+        by_id = {task.get("task_id"): task for task in all_tasks}
         blocked_tasks = []
         for task in all_tasks:
             if task.get("status") == "pending" and task.get("dependencies"):
                 for dep_id in task.get("dependencies"):
-                    dep_task = next((t for t in all_tasks if t.get("task_id") == dep_id), None)
+                    dep_task = by_id.get(dep_id)
                     if dep_task and dep_task.get("status") != "completed":
                         blocked_tasks.append({
                             "task_id": task.get("task_id"),
@@ -215,8 +377,7 @@ class ImplementationPhases:
         
         # Save report
         report_path = self.project_dir / "project_management_report.json"
-        with open(report_path, "w", encoding="utf-8") as f:
-            json.dump(report, f, indent=2)
+        await asyncio.to_thread(_write_json, report_path, report)
         
         logger.info(f"Completed Phase 3: Project Management - {completion_percentage:.2f}% complete")
         return report
@@ -244,11 +405,10 @@ class ImplementationPhases:
         
         # Save analysis and further requests
         analysis_path = self.project_dir / "post_merge_analysis.json"
-        with open(analysis_path, "w", encoding="utf-8") as f:
-            json.dump({
-                "analysis": analysis,
-                "further_requests": further_requests
-            }, f, indent=2)
+        await asyncio.to_thread(_write_json, analysis_path, {
+            "analysis": analysis,
+            "further_requests": further_requests
+        })
         
         logger.info(f"Completed Phase 4: Post-Merge Analysis - {len(further_requests)} further requests identified")
         return {
@@ -256,29 +416,75 @@ class ImplementationPhases:
             "further_requests": further_requests
         }
     
-    async def execute_all_phases(self, repo_name: Optional[str] = None) -> Dict[str, Any]:
+    async def execute_all_phases(self,
+                                 repo_name: Optional[str] = None,
+                                 progress_callback: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """
+        Execute all implementation phases.
+        
+        Phases 1 and 2 run in sequence; phases 3 and 4 only depend on phase 2
+        having finished, so they run concurrently.
+        
+        Args:
+            repo_name: GitHub repository name (format: "owner/repo")
+            progress_callback: Coroutine called with a short summary after each phase completes
+            
+        Returns:
+            Results from all phases
+        """
+        if self._run_lock.locked():
+            logger.info("Waiting for the implementation phases run in progress to finish")
+        
+        async with self._run_lock:
+            return await self._execute_all_phases(repo_name, progress_callback)
+    
+    async def _execute_all_phases(self,
+                                  repo_name: Optional[str],
+                                  progress_callback: Optional[Callable[[str], Awaitable[None]]]) -> Dict[str, Any]:
         """
-        Execute all implementation phases in sequence.
+        Execute all implementation phases while holding the run lock.
         
         Args:
             repo_name: GitHub repository name (format: "owner/repo")
+            progress_callback: Coroutine called with a short summary after each phase completes
             
         Returns:
             Results from all phases
         """
         logger.info("Starting execution of all implementation phases")
         
+        # Phases 3 and 4 report concurrently; deliver their updates one at a time, in order
+        progress_lock = asyncio.Lock()
+        
+        async def report_progress(summary: str):
+            if progress_callback:
+                async with progress_lock:
+                    await progress_callback(summary)
+        
         # Phase 1: Project Initialization
         implementation_plan = await self.phase1_project_initialization(repo_name)
+        phases = (implementation_plan or {}).get("phases", [])
+        await report_progress(f"Phase 1: Project Initialization complete ({len(phases)} phases planned)")
         
         # Phase 2: Development Cycle
         task_results = await self.phase2_development_cycle()
+        await report_progress(f"Phase 2: Development Cycle complete ({len(task_results)} tasks processed)")
         
         # Phase 3: Project Management
-        management_report = await self.phase3_project_management()
+        async def run_phase3() -> Dict[str, Any]:
+            management_report = await self.phase3_project_management()
+            completion_percentage = management_report["metrics"]["completion_percentage"]
+            await report_progress(f"Phase 3: Project Management complete ({completion_percentage:.2f}% complete)")
+            return management_report
         
         # Phase 4: Post-Merge Analysis
-        analysis_results = await self.phase4_post_merge_analysis()
+        async def run_phase4() -> Dict[str, Any]:
+            analysis_results = await self.phase4_post_merge_analysis()
+            further_requests = analysis_results["further_requests"]
+            await report_progress(f"Phase 4: Post-Merge Analysis complete ({len(further_requests)} further requests)")
+            return analysis_results
+        
+        management_report, analysis_results = await asyncio.gather(run_phase3(), run_phase4())
         
         # Compile results
         results = {
@@ -290,8 +496,7 @@ class ImplementationPhases:
         
         # Save overall results
         results_path = self.project_dir / "implementation_phases_results.json"
-        with open(results_path, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2)
+        await asyncio.to_thread(_write_json_sections, results_path, results)
         
         logger.info("Completed execution of all implementation phases")
         return results
\ No newline at end of file
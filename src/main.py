@@ -7,10 +7,9 @@ This module initializes the Slack app and starts the bot.
 import os
 import asyncio
 import logging
-from slack_bolt import App
-from slack_bolt.adapter.socket_mode import SocketModeHandler
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.socket_mode.aiohttp import AsyncSocketModeHandler
 from src.integrations.slack import SlackIntegration
-from src.workflows.implementation_phases import ImplementationPhases
 
 # Configure logging
 logging.basicConfig(
@@ -20,7 +19,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Initialize Slack app
-slack_app = App(token=os.environ["SLACK_BOT_TOKEN"])
+slack_app = AsyncApp(token=os.environ["SLACK_BOT_TOKEN"])
 
 # Initialize Slack integration
 slack_integration = SlackIntegration(
@@ -32,21 +31,16 @@ slack_integration = SlackIntegration(
     max_workers=int(os.environ.get("MAX_WORKERS", "5"))
 )
 
-# Initialize Implementation Phases
-implementation_phases = ImplementationPhases(
-    ai_user_agent=slack_integration.ai_user_agent,
-    assistant_agent=slack_integration.assistant_agent,
-    project_dir=os.environ.get("PROJECT_DIR", ".")
-)
+# Implementation Phases shared with the Slack integration
+implementation_phases = slack_integration.implementation_phases
 
 @slack_app.event("app_mention")
-def handle_app_mention_events(body, say):
+async def handle_app_mention_events(body, say):
     """Handle app mention events from Slack."""
     try:
         event = body["event"]
         
-        # Run the async handler in a new event loop
-        asyncio.run(slack_integration.handle_app_mention(event))
+        await slack_integration.handle_app_mention(event)
     
     except Exception as e:
         logger.error(f"Error handling app mention: {str(e)}", exc_info=True)
@@ -55,7 +49,7 @@ def handle_app_mention_events(body, say):
         thread_ts = event.get("thread_ts", event["ts"])
         
         # Send error message
-        say(
+        await say(
             text="Sorry, an error occurred while processing your request. Please try again.",
             channel=channel_id,
             thread_ts=thread_ts
@@ -80,8 +74,8 @@ def start_slack_bot():
     slack_integration.start()
     
     # Start the Socket Mode handler
-    handler = SocketModeHandler(slack_app, os.environ["SLACK_APP_TOKEN"])
-    handler.start()
+    handler = AsyncSocketModeHandler(slack_app, os.environ["SLACK_APP_TOKEN"])
+    asyncio.run(handler.start_async())
 
 if __name__ == "__main__":
     # Start the Slack bot
@@ -1,15 +1,49 @@
 import os
+import copy
+import threading
+from functools import lru_cache
 import requests
-import html2text
-from readability.readability import Document
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError, ReadTimeoutError
+from urllib3.util.retry import Retry
+import lxml.html
+from lxml.etree import ParserError
 from itertools import islice
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
 from duckduckgo_search import DDGS
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from langchain_core.tools import tool
+from typing import List
 from pydantic import BaseModel, Field
 
 
+# Keep-alive接続を再利用するための共有セッション
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+# 1ページあたりに読み込む最大バイト数
+_MAX_PAGE_BYTES = 256_000
+
+# 本文抽出時に取り除く要素
+_NON_CONTENT_XPATH = "//script|//style|//noscript|//nav|//header|//footer"
+
+# 同じ検索・同じURLの再取得を避けるための結果キャッシュ
+# （呼び出し側での変更がキャッシュに波及しないよう、出し入れはコピーで行う）
+_DDG_CACHE = TTLCache(maxsize=1024, ttl=900)
+_PAGE_CACHE = TTLCache(maxsize=512, ttl=3600)
+# スレッド履歴は短時間だけキャッシュする（ボット自身の投稿時はsend_slack_messageで破棄する）
+_THREAD_HISTORY_CACHE = TTLCache(maxsize=512, ttl=5)
+_CACHE_LOCK = threading.Lock()
+
+
 class SearchDDGInput(BaseModel):
     query: str = Field(description="検索したいキーワードを入力してください")
 
@@ -34,11 +68,16 @@ def search_ddg(query, max_result_num=5):
     - url
     """
 
+    key = (query, max_result_num)
+    with _CACHE_LOCK:
+        if key in _DDG_CACHE:
+            return copy.deepcopy(_DDG_CACHE[key])
+
     # [1] Web検索を実施
     res = DDGS().text(query, region="jp-jp", safesearch="off", backend="lite")
 
     # [2] 結果のリストを分解して戻す
-    return [
+    results = [
         {
             "title": r.get("title", ""),
             "snippet": r.get("body", ""),
@@ -47,6 +86,90 @@ def search_ddg(query, max_result_num=5):
         for r in islice(res, max_result_num)
     ]
 
+    with _CACHE_LOCK:
+        _DDG_CACHE[key] = copy.deepcopy(results)
+    return results
+
+
+def _fetch_page(url, timeout_sec=10):
+    """URLのWebページの本文を取得する（取得に成功した結果はキャッシュする）"""
+    with _CACHE_LOCK:
+        if url in _PAGE_CACHE:
+            return copy.deepcopy(_PAGE_CACHE[url])
+
+    result = _download_page(url, timeout_sec)
+
+    if "error_message" not in result["page_content"]:
+        with _CACHE_LOCK:
+            _PAGE_CACHE[url] = copy.deepcopy(result)
+    return result
+
+
+def _download_page(url, timeout_sec=10):
+    """URLのWebページを取得し、本文の文章を抽出する"""
+    try:
+        # 本文抽出に必要な先頭部分だけを読み込む
+        with _SESSION.get(url, stream=True, timeout=timeout_sec) as response:
+            # エラーページは本文として扱わない（キャッシュもされない）
+            if not response.ok:
+                return {
+                    "page_content": {
+                        "error_message": f"Could not download page (HTTP {response.status_code}). Please try to fetch other pages."
+                    },
+                }
+            raw = response.raw.read(_MAX_PAGE_BYTES, decode_content=True)
+            # Content-Typeヘッダで文字コードが指定されていればそれを使い、なければUTF-8とみなす
+            content_type = response.headers.get("Content-Type", "").lower()
+            encoding = response.encoding if "charset=" in content_type else "utf-8"
+    except (requests.exceptions.Timeout, ReadTimeoutError):
+        return {
+            "page_content": {
+                "error_message": "Could not download page due to Timeout Error. Please try to fetch other pages."
+            },
+        }
+    except (requests.exceptions.RequestException, HTTPError) as e:
+        # 接続エラー等は該当URLのみのエラーとして返し、fetch_pagesの他のページに影響させない
+        return {
+            "page_content": {
+                "error_message": f"Could not download page ({type(e).__name__}). Please try to fetch other pages."
+            },
+        }
+
+    # HTMLは一度だけパースし、本文以外の要素を除去してからテキストを抽出
+    try:
+        parser = lxml.html.HTMLParser(encoding=encoding)
+    except LookupError:
+        # 未知の文字コード名が指定されている場合
+        parser = lxml.html.HTMLParser(encoding="utf-8")
+    try:
+        # バイト列のまま渡す（str+エンコーディング宣言はlxmlがValueErrorにする）
+        tree = lxml.html.document_fromstring(raw, parser=parser)
+    except ParserError:
+        return {
+            "page_content": {
+                "error_message": "Could not parse page content. Please try to fetch other pages."
+            },
+        }
+
+    title = (tree.findtext(".//title") or "").strip()
+    for node in tree.xpath(_NON_CONTENT_XPATH):
+        node.drop_tree()
+
+    body = tree.find("body")
+    lines = (line.strip() for line in (body if body is not None else tree).itertext())
+    content = "\n".join(line for line in lines if line)
+
+    chunk_size = 1000 * 3  # 【chunk_sizeを大きくしておきます】
+    content = content[:chunk_size]
+
+    return {
+        "page_content": {
+            "title": title,
+            "content": content,  # chunks[page_num], を文書分割をやめて、contentにします
+            "has_next": False,  # page_num < len(chunks) - 1
+        },
+    }
+
 
 class FetchPageInput(BaseModel):
     url: str = Field()
@@ -74,31 +197,48 @@ def fetch_page(url, page_num=0, timeout_sec=10):
       - has_next: bool
     """
 
-    try:
-        response = requests.get(url, timeout=timeout_sec)
-        response.encoding = "utf-8"
-    except requests.exceptions.Timeout:
-        return {
-            "page_content": {
-                "error_message": "Could not download page due to Timeout Error. Please try to fetch other pages."
-            },
-        }
+    return _fetch_page(url, timeout_sec)
 
-    doc = Document(response.text)
-    title = doc.title()
-    html_content = doc.summary()
-    content = html2text.html2text(html_content)
 
-    chunk_size = 1000 * 3  # 【chunk_sizeを大きくしておきます】
-    content = content[:chunk_size]
+class FetchPagesInput(BaseModel):
+    urls: List[str] = Field(description="取得したいWebページのURLのリスト")
 
-    return {
-        "page_content": {
-            "title": title,
-            "content": content,  # chunks[page_num], を文書分割をやめて、contentにします
-            "has_next": False,  # page_num < len(chunks) - 1
-        },
-    }
+
+@tool(args_schema=FetchPagesInput)
+def fetch_pages(urls, timeout_sec=10):
+    """
+    ## Toolの説明
+    本Toolは複数のURLのWebページから本文の文章を並行して取得するツールです。
+    複数の検索結果を一度に確認するのに役立ちます
+
+    ## Toolの動作方法
+    1. userがWebページのURLのリストを入力します
+    2. assistantは各URLの本文の文章内容をusrに回答します
+
+    ## 戻り値の設定
+    Returns
+    -------
+    List[Dict[str, Any]]:
+    - url: str
+    - page_content
+      - title: str
+      - content: str
+      - has_next: bool
+    """
+
+    if not urls:
+        return []
+
+    # 各ページを並行して取得（待ち時間は合計ではなく最も遅いページ分）
+    with ThreadPoolExecutor(max_workers=min(len(urls), 10)) as executor:
+        results = executor.map(lambda u: _fetch_page(u, timeout_sec), urls)
+        return [{"url": u, **r} for u, r in zip(urls, results)]
+
+
+@lru_cache(maxsize=None)
+def _get_slack_client():
+    """Slack APIクライアントを生成し、以降の呼び出しで再利用する"""
+    return WebClient(token=os.environ["SLACK_BOT_TOKEN"])
 
 
 class SlackThreadHistoryInput(BaseModel):
@@ -123,7 +263,12 @@ def get_slack_thread_history(channel_id: str, thread_ts: str):
     - text: メッセージ内容
     - ts: タイムスタンプ
     """
-    client = WebClient(token=os.environ["SLACK_BOT_TOKEN"])
+    key = (channel_id, thread_ts)
+    with _CACHE_LOCK:
+        if key in _THREAD_HISTORY_CACHE:
+            return copy.deepcopy(_THREAD_HISTORY_CACHE[key])
+
+    client = _get_slack_client()
     
     try:
         response = client.conversations_replies(
@@ -132,7 +277,7 @@ def get_slack_thread_history(channel_id: str, thread_ts: str):
             inclusive=True
         )
         
-        return [
+        history = [
             {
                 "user": msg.get("user", ""),
                 "text": msg.get("text", ""),
@@ -140,6 +285,10 @@ def get_slack_thread_history(channel_id: str, thread_ts: str):
             }
             for msg in response["messages"]
         ]
+        
+        with _CACHE_LOCK:
+            _THREAD_HISTORY_CACHE[key] = copy.deepcopy(history)
+        return history
     except SlackApiError as e:
         return {"error": f"Slack API error: {e.response['error']}"}
 
@@ -165,7 +314,7 @@ def send_slack_message(channel_id: str, text: str, thread_ts: str = None):
     Dict[str, str]:
     - ts: 送信したメッセージのタイムスタンプ
     """
-    client = WebClient(token=os.environ["SLACK_BOT_TOKEN"])
+    client = _get_slack_client()
     
     try:
         response = client.chat_postMessage(
@@ -174,9 +323,14 @@ def send_slack_message(channel_id: str, text: str, thread_ts: str = None):
             thread_ts=thread_ts
         )
         
+        # 投稿したスレッドの履歴キャッシュは古くなるので破棄する
+        if thread_ts:
+            with _CACHE_LOCK:
+                _THREAD_HISTORY_CACHE.pop((channel_id, thread_ts), None)
+        
         return {"ts": response["ts"]}
     except SlackApiError as e:
         return {"error": f"Slack API error: {e.response['error']}"}
 
 
-all_tools = [search_ddg, fetch_page, get_slack_thread_history, send_slack_message]
\ No newline at end of file
+all_tools = [search_ddg, fetch_page, fetch_pages, get_slack_thread_history, send_slack_message]
\ No newline at end of file